@@ -1,270 +1,543 @@
+import functools
+import logging
 import sqlite3
-from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+import threading
+import weakref
+from typing import Iterator, List, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQL precompilado a nivel de módulo: reutilizar el mismo texto en cada
+# llamada permite que el cache de sentencias de la conexión evite
+# re-parsear y re-planificar la consulta
+_SQL_INSERT_PACIENTE = '''
+    INSERT INTO pacientes (nombre, apellido, dni, fecha_nacimiento, telefono, email, direccion)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_FIND_PACIENTE_DNI = 'SELECT * FROM pacientes WHERE dni = ?'
+
+_SQL_LISTAR_PACIENTES = 'SELECT * FROM pacientes ORDER BY apellido, nombre'
+
+_SQL_INSERT_MEDICO = '''
+    INSERT INTO medicos (nombre, apellido, especialidad, matricula, telefono, email)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_LISTAR_MEDICOS = 'SELECT * FROM medicos ORDER BY especialidad, apellido, nombre'
+
+_SQL_LISTAR_MEDICOS_ESPECIALIDAD = 'SELECT * FROM medicos WHERE especialidad = ? ORDER BY apellido, nombre'
+
+_SQL_INSERT_TURNO = '''
+    INSERT INTO turnos (id_paciente, id_medico, fecha_hora, fecha_hora_fin, duracion, motivo_consulta)
+    SELECT ?, ?, datetime(?), datetime(?, '+' || ? || ' minutes'), ?, ?
+    WHERE NOT EXISTS (
+        SELECT 1 FROM turnos
+        WHERE id_medico = ?
+        AND estado IN ('pendiente', 'confirmado')
+        AND fecha_hora < datetime(?, '+' || ? || ' minutes')
+        AND fecha_hora_fin > datetime(?)
+    )
+'''
+
+_SQL_DISPONIBILIDAD = '''
+    SELECT datetime(?) IS NULL AS fecha_invalida,
+           EXISTS(
+               SELECT 1 FROM turnos
+               WHERE id_medico = ?
+               AND estado IN ('pendiente', 'confirmado')
+               AND fecha_hora < datetime(?, '+' || ? || ' minutes')
+               AND fecha_hora_fin > datetime(?)
+               LIMIT 1
+           ) AS ocupado
+'''
+
+_SQL_TURNOS_POR_FECHA = 'SELECT * FROM turnos_dia WHERE fecha = ? ORDER BY hora'
+
+_SQL_TURNOS_PACIENTE = '''
+    SELECT t.id_turno, m.nombre, m.apellido, m.especialidad,
+           t.fecha_hora, t.duracion, t.estado, t.motivo_consulta
+    FROM turnos t
+    JOIN medicos m ON t.id_medico = m.matricula
+    WHERE t.id_paciente = ?
+    ORDER BY t.fecha_hora DESC
+'''
+
+_SQL_RESUMEN_DIA = '''
+    SELECT COALESCE(SUM(CASE WHEN estado = 'pendiente' THEN 1 END), 0) AS pendientes,
+           COALESCE(SUM(CASE WHEN estado = 'confirmado' THEN 1 END), 0) AS confirmados,
+           COALESCE(SUM(CASE WHEN estado = 'cancelado' THEN 1 END), 0) AS cancelados,
+           COALESCE(SUM(CASE WHEN estado = 'completado' THEN 1 END), 0) AS completados
+    FROM turnos_dia
+    WHERE fecha = ?
+'''
+
+_SQL_UPDATE_ESTADO = 'UPDATE turnos SET estado = ? WHERE id_turno = ?'
+
+_SQL_UPDATE_ESTADO_OBS = 'UPDATE turnos SET estado = ?, observaciones = ? WHERE id_turno = ?'
+
+
+def _finalizar_conexion(local):
+    """Cierra la conexión pendiente de una instancia recolectada.
+
+    Corre como finalizador, posiblemente durante el apagado del
+    intérprete: no registra nada ni refresca estadísticas, sólo libera
+    el handle si un cerrar_conexion explícito no lo hizo antes.
+    """
+    conn = getattr(local, 'conn', None)
+    if conn is not None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        local.conn = None
+        local.cursor = None
+
+
+def _transaccional(metodo):
+    """Envuelve un método en una transacción explícita.
+
+    Abre BEGIN IMMEDIATE sólo si no hay una transacción activa, lo que
+    permite que un llamador agrupe varias mutaciones bajo un único
+    COMMIT (un solo fsync) en vez de pagar uno por operación. Si el
+    llamador ya abrió una transacción, la operación corre dentro de un
+    SAVEPOINT: un error la deshace sólo a ella, sin arrastrar las
+    escrituras previas del llamador.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if self.conn.in_transaction:
+            self._local.savepoints = getattr(self._local, 'savepoints', 0) + 1
+            self.conn.execute("SAVEPOINT operacion")
+            try:
+                resultado = metodo(self, *args, **kwargs)
+                self.conn.execute("RELEASE operacion")
+                return resultado
+            except Exception:
+                self.conn.execute("ROLLBACK TO operacion")
+                self.conn.execute("RELEASE operacion")
+                raise
+            finally:
+                self._local.savepoints -= 1
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = metodo(self, *args, **kwargs)
+        except Exception:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            raise
+        if self.conn.in_transaction:
+            self.conn.commit()
+        return resultado
+    return envoltura
+
 
 class GestionTurnos:
     def __init__(self, db_name: str = "hospital_turnos.db"):
         """Inicializa la conexión a la base de datos"""
         self.db_name = db_name
-        self.conn = None
-        self.cursor = None
+        # Una conexión por hilo: WAL admite lectores concurrentes con un
+        # escritor, así cada hilo de un servidor lee sin compartir el lock
+        # de una única conexión
+        self._local = threading.local()
+        self._finalizer = weakref.finalize(self, _finalizar_conexion, self._local)
         self.conectar()
         self.crear_tablas()
-    
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión del hilo actual, abierta perezosamente"""
+        if getattr(self._local, 'conn', None) is None:
+            self.conectar()
+        return self._local.conn
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """Cursor del hilo actual, abierto perezosamente"""
+        if getattr(self._local, 'cursor', None) is None:
+            self.conectar()
+        return self._local.cursor
+
     def conectar(self):
-        """Establece la conexión con la base de datos"""
+        """Establece la conexión del hilo actual con la base de datos"""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
-            print(f"✓ Conexión exitosa a {self.db_name}")
+            conn = sqlite3.connect(self.db_name, isolation_level=None,
+                                   check_same_thread=False,
+                                   cached_statements=256)
+            conn.set_trace_callback(None)
+            # Acceso por nombre de columna sin costo extra por fila
+            conn.row_factory = sqlite3.Row
+            # PRAGMAs de rendimiento: WAL evita un fsync por commit, el cache
+            # y el mmap reducen lecturas de disco en páginas calientes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-64000")
+            conn.execute("PRAGMA mmap_size=30000000000")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.cursor = conn.cursor()
+            logger.debug("Conexión exitosa a %s", self.db_name)
         except sqlite3.Error as e:
-            print(f"✗ Error al conectar: {e}")
+            logger.error("Error al conectar: %s", e)
     
     def crear_tablas(self):
         """Crea las tablas necesarias si no existen"""
         try:
-            # Tabla de Pacientes
+            # Tabla de Pacientes: el DNI ya es clave natural única, usarlo
+            # como PRIMARY KEY con WITHOUT ROWID deja un solo B-tree y las
+            # búsquedas por DNI en una única bajada de índice
             self.cursor.execute('''
-                CREATE DATABASE turnos_hospital;
-                USE turnos_hospital;
                 CREATE TABLE IF NOT EXISTS pacientes (
-                    id_paciente INTEGER PRIMARY KEY NOT NULL AUTOINCREMENT,
+                    dni VARCHAR(20) PRIMARY KEY NOT NULL,
                     nombre VARCHAR(50) NOT NULL,
                     apellido VARCHAR(50) NOT NULL,
-                    dni VARCHAR(20) UNIQUE NOT NULL,
-                    fecha_nacimiento DATE NOT NULL,
-                    genero VARCHAR(10),
+                    fecha_nacimiento DATE,
                     telefono VARCHAR(50),
-                    domicilio VARCHAR(20)
-                )
+                    email VARCHAR(50),
+                    direccion VARCHAR(50)
+                ) WITHOUT ROWID
             ''')
-            
-            # Tabla de Médicos
+
+            # Tabla de Médicos: ídem con la matrícula
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS medicos (
-                    id_medico INTEGER PRIMARY KEY AUTOINCREMENT,
+                    matricula VARCHAR(20) PRIMARY KEY NOT NULL,
                     nombre VARCHAR(50) NOT NULL,
                     apellido VARCHAR(50) NOT NULL,
                     especialidad VARCHAR(50) NOT NULL,
-                    telefono VARCHAR(50) NOT NULL
-                )
+                    telefono VARCHAR(50),
+                    email VARCHAR(50)
+                ) WITHOUT ROWID
             ''')
             
             # Tabla de Turnos
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS turnos (
                     id_turno INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha_hora TEXT NOT NULL,
+                    fecha_hora_fin TEXT NOT NULL,
+                    duracion INT NOT NULL DEFAULT 30,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    motivo_consulta TEXT,
+                    observaciones TEXT,
+                    id_paciente VARCHAR(20) NOT NULL,
+                    id_medico VARCHAR(20) NOT NULL,
+                    FOREIGN KEY (id_paciente) REFERENCES pacientes(dni),
+                    FOREIGN KEY (id_medico) REFERENCES medicos(matricula)
+                )
+            ''')
+
+            # Índices sobre las columnas de búsqueda y claves foráneas
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_turnos_medico_rango ON turnos(id_medico, fecha_hora, fecha_hora_fin)')
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_turnos_paciente ON turnos(id_paciente, fecha_hora)')
+
+            # Índice parcial sólo sobre turnos activos: la mayoría de los
+            # turnos termina en cancelado/completado, así el índice que usa
+            # verificar_disponibilidad crece con la agenda vigente y no con
+            # el histórico (los índices parciales requieren SQLite >= 3.8)
+            if sqlite3.sqlite_version_info >= (3, 8, 0):
+                self.cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_turnos_activos
+                    ON turnos(id_medico, fecha_hora, fecha_hora_fin)
+                    WHERE estado IN ('pendiente', 'confirmado')
+                ''')
+
+            # Vista materializada de la agenda diaria: guarda la fila ya
+            # desnormalizada para que listar_turnos_por_fecha sea un único
+            # barrido indexado en vez de un JOIN de tres tablas
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS turnos_dia (
+                    id_turno INT PRIMARY KEY,
                     fecha DATE NOT NULL,
-                    horario TIME NOT NULL,
-                    id_paciente INT NOT NULL,
-                    id_medico INT NOT NULL,
-                    id_consultorio INT NOT NULL,
-                    FOREIGN KEY (id_paciente) REFERENCES pacientes(id_paciente),
-                    FOREIGN KEY (id_medico) REFERENCES medicos(id_medico),
+                    hora TIME NOT NULL,
+                    pac_nombre VARCHAR(50),
+                    pac_apellido VARCHAR(50),
+                    med_nombre VARCHAR(50),
+                    med_apellido VARCHAR(50),
+                    especialidad VARCHAR(50),
+                    estado TEXT
                 )
             ''')
-            
-            self.conn.commit()
-            print("✓ Tablas creadas correctamente")
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_turnos_dia_fecha ON turnos_dia(fecha, hora)')
+
+            # Triggers que mantienen turnos_dia sincronizada con turnos
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_turnos_dia_ins AFTER INSERT ON turnos
+                BEGIN
+                    INSERT OR REPLACE INTO turnos_dia
+                    SELECT NEW.id_turno, date(NEW.fecha_hora), time(NEW.fecha_hora),
+                           p.nombre, p.apellido, m.nombre, m.apellido, m.especialidad, NEW.estado
+                    FROM pacientes p, medicos m
+                    WHERE p.dni = NEW.id_paciente AND m.matricula = NEW.id_medico;
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_turnos_dia_upd AFTER UPDATE ON turnos
+                BEGIN
+                    UPDATE turnos_dia
+                    SET fecha = date(NEW.fecha_hora), hora = time(NEW.fecha_hora),
+                        estado = NEW.estado
+                    WHERE id_turno = NEW.id_turno;
+                END
+            ''')
+            self.cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_turnos_dia_del AFTER DELETE ON turnos
+                BEGIN
+                    DELETE FROM turnos_dia WHERE id_turno = OLD.id_turno;
+                END
+            ''')
+
+            # Estadísticas de selectividad para que el planificador elija
+            # los índices recién creados en vez de un barrido. Sólo la
+            # primera vez: después las mantiene el PRAGMA optimize del
+            # cierre, sin pagar un barrido completo en cada arranque.
+            self.cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if self.cursor.fetchone() is None:
+                self.cursor.execute("ANALYZE")
+
+            logger.debug("Tablas creadas correctamente")
         except sqlite3.Error as e:
-            print(f"✗ Error al crear tablas: {e}")
+            logger.error("Error al crear tablas: %s", e)
     
     # ==================== PACIENTES ====================
     
-    def registrar_paciente(self, nombre: str, apellido: str, dni: str, 
-                          fecha_nacimiento: str = None, telefono: str = None, 
-                          email: str = None, direccion: str = None) -> Optional[int]:
-        """Registra un nuevo paciente"""
+    def registrar_paciente(self, nombre: str, apellido: str, dni: str,
+                          fecha_nacimiento: str = None, telefono: str = None,
+                          email: str = None, direccion: str = None) -> Optional[str]:
+        """Registra un nuevo paciente. Devuelve el DNI, que es su clave."""
+        if self.registrar_pacientes_bulk([(nombre, apellido, dni, fecha_nacimiento,
+                                           telefono, email, direccion)]) == 0:
+            return None
+        logger.debug("Paciente %s %s registrado con DNI %s", nombre, apellido, dni)
+        return dni
+
+    @_transaccional
+    def registrar_pacientes_bulk(self, pacientes: List[Tuple]) -> int:
+        """Registra varios pacientes en una sola transacción.
+
+        Cada tupla es (nombre, apellido, dni, fecha_nacimiento, telefono,
+        email, direccion). Devuelve la cantidad de filas insertadas.
+        """
         try:
-            self.cursor.execute('''
-                INSERT INTO pacientes (id_paciente, nombre, apellido, dni, fecha_nacimiento, genero, telefono, domicilio)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (nombre, apellido, dni, fecha_nacimiento, telefono, email, direccion))
-            self.conn.commit()
-            print(f"✓ Paciente {nombre} {apellido} registrado con ID: {self.cursor.lastrowid}")
-            return self.cursor.lastrowid
+            self.cursor.executemany(_SQL_INSERT_PACIENTE, pacientes)
+            return len(pacientes)
         except sqlite3.IntegrityError:
-            print(f"✗ Error: Ya existe un paciente con DNI {dni}")
-            return None
+            self._revertir_operacion()
+            logger.error("Ya existe un paciente con alguno de los DNI informados")
+            return 0
         except sqlite3.Error as e:
-            print(f"✗ Error al registrar paciente: {e}")
-            return None
+            self._revertir_operacion()
+            logger.error("Error al registrar pacientes: %s", e)
+            return 0
     
     def buscar_paciente_por_dni(self, dni: str) -> Optional[Tuple]:
         """Busca un paciente por su DNI"""
         try:
-            self.cursor.execute('SELECT * FROM pacientes WHERE dni = ?', (dni,))
+            self.cursor.execute(_SQL_FIND_PACIENTE_DNI, (dni,))
             paciente = self.cursor.fetchone()
             return paciente
         except sqlite3.Error as e:
-            print(f"✗ Error al buscar paciente: {e}")
+            logger.error("Error al buscar paciente: %s", e)
             return None
     
-    def listar_pacientes(self) -> List[Tuple]:
-        """Lista todos los pacientes"""
+    def listar_pacientes(self) -> Iterator[sqlite3.Row]:
+        """Lista todos los pacientes, en bloques de a 1000 filas"""
         try:
-            self.cursor.execute('SELECT * FROM pacientes ORDER BY apellido, nombre')
-            return self.cursor.fetchall()
+            cursor = self.conn.cursor()
+            cursor.execute(_SQL_LISTAR_PACIENTES)
         except sqlite3.Error as e:
-            print(f"✗ Error al listar pacientes: {e}")
-            return []
+            logger.error("Error al listar pacientes: %s", e)
+            return
+        yield from self._iterar(cursor)
     
     # ==================== MÉDICOS ====================
     
-    def registrar_medico(self, nombre: str, apellido: str, especialidad: str, 
-                        matricula: str, telefono: str = None, email: str = None) -> Optional[int]:
-        """Registra un nuevo médico"""
+    def registrar_medico(self, nombre: str, apellido: str, especialidad: str,
+                        matricula: str, telefono: str = None, email: str = None) -> Optional[str]:
+        """Registra un nuevo médico. Devuelve la matrícula, que es su clave."""
+        if self.registrar_medicos_bulk([(nombre, apellido, especialidad,
+                                         matricula, telefono, email)]) == 0:
+            return None
+        logger.debug("Médico %s %s (%s) registrado con matrícula %s", nombre, apellido, especialidad, matricula)
+        return matricula
+
+    @_transaccional
+    def registrar_medicos_bulk(self, medicos: List[Tuple]) -> int:
+        """Registra varios médicos en una sola transacción.
+
+        Cada tupla es (nombre, apellido, especialidad, matricula, telefono,
+        email). Devuelve la cantidad de filas insertadas.
+        """
         try:
-            self.cursor.execute('''
-                INSERT INTO medicos (nombre, apellido, especialidad, matricula, telefono, email)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (nombre, apellido, especialidad, matricula, telefono, email))
-            self.conn.commit()
-            print(f"✓ Médico {nombre} {apellido} ({especialidad}) registrado con ID: {self.cursor.lastrowid}")
-            return self.cursor.lastrowid
+            self.cursor.executemany(_SQL_INSERT_MEDICO, medicos)
+            return len(medicos)
         except sqlite3.IntegrityError:
-            print(f"✗ Error: Ya existe un médico con matrícula {matricula}")
-            return None
+            self._revertir_operacion()
+            logger.error("Ya existe un médico con alguna de las matrículas informadas")
+            return 0
         except sqlite3.Error as e:
-            print(f"✗ Error al registrar médico: {e}")
-            return None
+            self._revertir_operacion()
+            logger.error("Error al registrar médicos: %s", e)
+            return 0
     
-    def listar_medicos(self, especialidad: str = None) -> List[Tuple]:
+    def listar_medicos(self, especialidad: str = None) -> Iterator[sqlite3.Row]:
         """Lista todos los médicos, opcionalmente filtrados por especialidad"""
         try:
+            cursor = self.conn.cursor()
             if especialidad:
-                self.cursor.execute('SELECT * FROM medicos WHERE especialidad = ? ORDER BY apellido, nombre', (especialidad,))
+                cursor.execute(_SQL_LISTAR_MEDICOS_ESPECIALIDAD, (especialidad,))
             else:
-                self.cursor.execute('SELECT * FROM medicos ORDER BY especialidad, apellido, nombre')
-            return self.cursor.fetchall()
+                cursor.execute(_SQL_LISTAR_MEDICOS)
         except sqlite3.Error as e:
-            print(f"✗ Error al listar médicos: {e}")
-            return []
+            logger.error("Error al listar médicos: %s", e)
+            return
+        yield from self._iterar(cursor)
     
     # ==================== TURNOS ====================
     
-    def crear_turno(self, paciente_id: int, medico_id: int, fecha_hora: str, 
+    @_transaccional
+    def crear_turno(self, paciente_id: str, medico_id: str, fecha_hora: str,
                    duracion: int = 30, motivo_consulta: str = None) -> Optional[int]:
         """Crea un nuevo turno"""
         try:
-            # Verificar disponibilidad
-            if not self.verificar_disponibilidad(medico_id, fecha_hora, duracion):
-                print("✗ El médico no está disponible en ese horario")
+            # El control de disponibilidad viaja dentro del INSERT como
+            # guarda NOT EXISTS: una sola sentencia, sin carrera entre el
+            # chequeo y la escritura
+            self.cursor.execute(_SQL_INSERT_TURNO,
+                                (paciente_id, medico_id, fecha_hora,
+                                 fecha_hora, duracion, duracion, motivo_consulta,
+                                 medico_id, fecha_hora, duracion, fecha_hora))
+            if self.cursor.rowcount == 0:
+                logger.debug("El médico %s no está disponible en ese horario", medico_id)
                 return None
-            
-            self.cursor.execute('''
-                INSERT INTO turnos (paciente_id, medico_id, fecha_hora, duracion, motivo_consulta)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (paciente_id, medico_id, fecha_hora, duracion, motivo_consulta))
-            self.conn.commit()
-            print(f"✓ Turno creado con ID: {self.cursor.lastrowid}")
+            logger.debug("Turno creado con ID %s", self.cursor.lastrowid)
             return self.cursor.lastrowid
         except sqlite3.Error as e:
-            print(f"✗ Error al crear turno: {e}")
+            self._revertir_operacion()
+            logger.error("Error al crear turno: %s", e)
             return None
     
-    def verificar_disponibilidad(self, medico_id: int, fecha_hora: str, duracion: int = 30) -> bool:
+    def verificar_disponibilidad(self, medico_id: str, fecha_hora: str, duracion: int = 30) -> bool:
         """Verifica si el médico está disponible en el horario solicitado"""
         try:
-            # Convertir fecha_hora a datetime
-            dt = datetime.strptime(fecha_hora, '%Y-%m-%d %H:%M')
-            dt_fin = dt + timedelta(minutes=duracion)
-            
-            self.cursor.execute('''
-                SELECT COUNT(*) FROM turnos 
-                WHERE medico_id = ? 
-                AND estado IN ('pendiente', 'confirmado')
-                AND (
-                    (datetime(fecha_hora) < datetime(?) AND datetime(fecha_hora, '+' || duracion || ' minutes') > datetime(?))
-                    OR
-                    (datetime(fecha_hora) >= datetime(?) AND datetime(fecha_hora) < datetime(?))
-                )
-            ''', (medico_id, dt_fin.strftime('%Y-%m-%d %H:%M'), dt.strftime('%Y-%m-%d %H:%M'),
-                  dt.strftime('%Y-%m-%d %H:%M'), dt_fin.strftime('%Y-%m-%d %H:%M')))
-            
-            count = self.cursor.fetchone()[0]
-            return count == 0
-        except Exception as e:
-            print(f"✗ Error al verificar disponibilidad: {e}")
+            # Test de solapamiento de dos comparaciones sobre columnas
+            # indexadas: permite usar idx_turnos_medico_rango. EXISTS corta
+            # en el primer turno superpuesto en vez de contarlos todos. El
+            # fin del intervalo lo calcula SQLite, sin strptime/strftime
+            # por llamada del lado Python; si la fecha no parsea,
+            # datetime() da NULL y la consulta lo reporta aparte.
+            self.cursor.execute(_SQL_DISPONIBILIDAD,
+                                (fecha_hora, medico_id, fecha_hora, duracion, fecha_hora))
+
+            fila = self.cursor.fetchone()
+            if fila['fecha_invalida']:
+                logger.error("Fecha y hora inválidas: %r", fecha_hora)
+                return False
+            return fila['ocupado'] == 0
+        except sqlite3.Error as e:
+            logger.error("Error al verificar disponibilidad: %s", e)
             return False
     
-    def listar_turnos_por_fecha(self, fecha: str) -> List[Tuple]:
+    def listar_turnos_por_fecha(self, fecha: str) -> Iterator[sqlite3.Row]:
         """Lista todos los turnos de una fecha específica"""
         try:
-            self.cursor.execute('''
-                SELECT t.id, p.nombre, p.apellido, m.nombre, m.apellido, m.especialidad,
-                       t.fecha_hora, t.duracion, t.estado, t.motivo_consulta
-                FROM turnos t
-                JOIN pacientes p ON t.paciente_id = p.id
-                JOIN medicos m ON t.medico_id = m.id
-                WHERE DATE(t.fecha_hora) = ?
-                ORDER BY t.fecha_hora
-            ''', (fecha,))
-            return self.cursor.fetchall()
+            cursor = self.conn.cursor()
+            cursor.execute(_SQL_TURNOS_POR_FECHA, (fecha,))
         except sqlite3.Error as e:
-            print(f"✗ Error al listar turnos: {e}")
-            return []
+            logger.error("Error al listar turnos: %s", e)
+            return
+        yield from self._iterar(cursor)
     
-    def listar_turnos_paciente(self, paciente_id: int) -> List[Tuple]:
+    def listar_turnos_paciente(self, paciente_id: str) -> Iterator[sqlite3.Row]:
         """Lista todos los turnos de un paciente"""
         try:
-            self.cursor.execute('''
-                SELECT t.id, m.nombre, m.apellido, m.especialidad,
-                       t.fecha_hora, t.duracion, t.estado, t.motivo_consulta
-                FROM turnos t
-                JOIN medicos m ON t.medico_id = m.id
-                WHERE t.paciente_id = ?
-                ORDER BY t.fecha_hora DESC
-            ''', (paciente_id,))
-            return self.cursor.fetchall()
+            cursor = self.conn.cursor()
+            cursor.execute(_SQL_TURNOS_PACIENTE, (paciente_id,))
         except sqlite3.Error as e:
-            print(f"✗ Error al listar turnos del paciente: {e}")
-            return []
+            logger.error("Error al listar turnos del paciente: %s", e)
+            return
+        yield from self._iterar(cursor)
     
+    def resumen_dia(self, fecha: str) -> Optional[sqlite3.Row]:
+        """Cuenta los turnos del día por estado en una sola pasada.
+
+        Devuelve una fila con pendientes/confirmados/cancelados/completados
+        usando agregados condicionales, en vez de un COUNT(*) por estado.
+        """
+        try:
+            self.cursor.execute(_SQL_RESUMEN_DIA, (fecha,))
+            return self.cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error("Error al resumir turnos del día: %s", e)
+            return None
+
+    @_transaccional
     def actualizar_estado_turno(self, turno_id: int, nuevo_estado: str, observaciones: str = None) -> bool:
         """Actualiza el estado de un turno"""
         estados_validos = ['pendiente', 'confirmado', 'cancelado', 'completado']
         if nuevo_estado not in estados_validos:
-            print(f"✗ Estado inválido. Use uno de: {estados_validos}")
+            logger.error("Estado inválido %r. Use uno de: %s", nuevo_estado, estados_validos)
             return False
         
         try:
             if observaciones:
-                self.cursor.execute('''
-                    UPDATE turnos SET estado = ?, observaciones = ? WHERE id = ?
-                ''', (nuevo_estado, observaciones, turno_id))
+                self.cursor.execute(_SQL_UPDATE_ESTADO_OBS, (nuevo_estado, observaciones, turno_id))
             else:
-                self.cursor.execute('''
-                    UPDATE turnos SET estado = ? WHERE id = ?
-                ''', (nuevo_estado, turno_id))
-            
-            self.conn.commit()
+                self.cursor.execute(_SQL_UPDATE_ESTADO, (nuevo_estado, turno_id))
+
             if self.cursor.rowcount > 0:
-                print(f"✓ Estado del turno actualizado a: {nuevo_estado}")
+                logger.debug("Estado del turno %s actualizado a %s", turno_id, nuevo_estado)
                 return True
             else:
-                print("✗ No se encontró el turno especificado")
+                logger.debug("No se encontró el turno %s", turno_id)
                 return False
         except sqlite3.Error as e:
-            print(f"✗ Error al actualizar estado: {e}")
+            self._revertir_operacion()
+            logger.error("Error al actualizar estado: %s", e)
             return False
     
     # ==================== UTILIDADES ====================
-    
+
+    def _revertir_operacion(self):
+        """Deshace sólo la operación en curso.
+
+        Anidada en la transacción de un llamador vuelve al SAVEPOINT que
+        abrió el decorador; en el nivel superior revierte la transacción
+        completa.
+        """
+        if getattr(self._local, 'savepoints', 0) > 0:
+            self.conn.execute("ROLLBACK TO operacion")
+        elif self.conn.in_transaction:
+            self.conn.rollback()
+
+    @staticmethod
+    def _iterar(cursor, tamano_bloque: int = 1000) -> Iterator[sqlite3.Row]:
+        """Consume un cursor de a bloques, acotando la memoria de trabajo"""
+        while True:
+            filas = cursor.fetchmany(tamano_bloque)
+            if not filas:
+                return
+            yield from filas
+
     def cerrar_conexion(self):
-        """Cierra la conexión con la base de datos"""
-        if self.conn:
-            self.conn.close()
-            print("✓ Conexión cerrada")
-    
-    def __del__(self):
-        """Destructor para asegurar el cierre de la conexión"""
-        self.cerrar_conexion()
+        """Cierra la conexión del hilo actual con la base de datos"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Refresca estadísticas sobre los índices que lo ameriten
+            conn.execute("PRAGMA optimize")
+            conn.close()
+            self._local.conn = None
+            self._local.cursor = None
+            logger.debug("Conexión cerrada")
 
 
 # ==================== EJEMPLO DE USO ====================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(levelname)s %(message)s")
+
     # Crear instancia del sistema
     sistema = GestionTurnos()
     
@@ -322,9 +595,9 @@ if __name__ == "__main__":
     print("-" * 50)
     turnos = sistema.listar_turnos_por_fecha("2025-11-20")
     for turno in turnos:
-        print(f"ID: {turno[0]} | Paciente: {turno[1]} {turno[2]} | "
-              f"Médico: {turno[3]} {turno[4]} ({turno[5]}) | "
-              f"Hora: {turno[6]} | Estado: {turno[8]}")
+        print(f"ID: {turno[0]} | Paciente: {turno[3]} {turno[4]} | "
+              f"Médico: {turno[5]} {turno[6]} ({turno[7]}) | "
+              f"Hora: {turno[2]} | Estado: {turno[8]}")
     
     # Actualizar estado de turno
     print("\n5. ACTUALIZANDO ESTADO DE TURNO")
@@ -336,7 +609,7 @@ if __name__ == "__main__":
     print("-" * 50)
     paciente = sistema.buscar_paciente_por_dni("2432423")
     if paciente:
-        print(f"Encontrado: {paciente[1]} {paciente[2]} - DNI: {paciente[3]}")
+        print(f"Encontrado: {paciente['nombre']} {paciente['apellido']} - DNI: {paciente['dni']}")
     
     print("\n" + "="*50)
     print("FIN DEL EJEMPLO")